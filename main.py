@@ -1,34 +1,129 @@
 import os
+import asyncio
+import base64
+import logging
 import hashlib
+import hmac
+import secrets
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from typing import List, Dict, Any
-from fastapi import FastAPI, HTTPException
+from dataclasses import dataclass, fields
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
 from bson import ObjectId
-
-from database import db, create_document, get_documents
+from cachetools import TTLCache
+import numpy as np
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+import bcrypt
+import orjson
+
+from database import db, create_document, get_documents, acquire_lock, release_lock
 from schemas import (
     User, LoginRequest, ChangePasswordRequest,
-    RoadmapStep, AssessmentResult, Progress, Resume,
-    ALLOWED_QUALIFICATIONS,
+    AssessmentResult, Progress, Resume,
+    ALLOWED_QUALIFICATIONS, FieldError, check_str, as_int,
 )
 
-app = FastAPI(title="Lernify Road API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Every worker runs startup; only the lock holder seeds
+    if db is not None:
+        await ensure_indexes()
+        if await acquire_lock("seed_roadmaps"):
+            try:
+                await ensure_roadmaps_seeded()
+            finally:
+                await release_lock("seed_roadmaps")
+    yield
+
+
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="Lernify Road API", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Comma-separated list of allowed origins. Unset means no cross-origin access; the
+# wildcard is only available behind an explicit CORS_ALLOW_ALL=1 for development.
+FRONTEND_ORIGINS = [o.strip() for o in os.getenv("FRONTEND_ORIGIN", "").split(",") if o.strip()]
+if os.getenv("CORS_ALLOW_ALL") == "1":
+    logger.warning("CORS_ALLOW_ALL=1: accepting credentialed requests from any origin; do not use in production")
+    FRONTEND_ORIGINS = ["*"]
+elif not FRONTEND_ORIGINS:
+    logger.warning("FRONTEND_ORIGIN is not set; cross-origin requests will be rejected")
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=FRONTEND_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT"],
+    allow_headers=["authorization", "content-type"],
+    max_age=86400,
 )
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 # ---------------------------
 # Helpers
 # ---------------------------
 
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))  # ~250 ms per hash
+# Keys the bcrypt pre-hash; changing it invalidates every stored bcrypt hash
+PASSWORD_PEPPER = os.getenv("PASSWORD_PEPPER", "").encode("utf-8")
+PASSWORD_CACHE_SIZE = 4096
+
+# (hmac(password), stored_hash) -> bool, most recently used last. The HMAC key is
+# per-process so cached keys are useless outside this process's memory.
+_password_cache: "OrderedDict[tuple[str, str], bool]" = OrderedDict()
+_PASSWORD_CACHE_SECRET = secrets.token_bytes(32)
+
+
+def _bcrypt_input(password: str) -> bytes:
+    # bcrypt silently ignores everything past 72 bytes; pre-hashing makes the whole
+    # password count. base64 keeps it at 44 bytes with no NULs.
+    digest = hmac.new(PASSWORD_PEPPER, password.encode("utf-8"), hashlib.sha256).digest()
+    return base64.b64encode(digest)
+
+
 def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    return bcrypt.hashpw(_bcrypt_input(password), salt).decode("utf-8")
+
+
+def is_legacy_hash(stored_hash: str) -> bool:
+    return not stored_hash.startswith("$2")
+
+
+def _check_password(password: str, stored_hash: str) -> bool:
+    if is_legacy_hash(stored_hash):
+        # Legacy unsalted SHA-256 hashes from before the bcrypt switch
+        return hmac.compare_digest(hashlib.sha256(password.encode("utf-8")).hexdigest(), stored_hash)
+    return bcrypt.checkpw(_bcrypt_input(password), stored_hash.encode("utf-8"))
+
+
+async def verify_password(password: str, stored_hash: str) -> bool:
+    """Check a password against its stored hash, memoizing the KDF result.
+
+    The stored hash is part of the key, so a password change (new salt)
+    naturally stops matching old entries. The cache is only touched on the
+    event loop; just the KDF runs in the threadpool.
+    """
+    digest = hmac.new(_PASSWORD_CACHE_SECRET, password.encode("utf-8"), hashlib.sha256).hexdigest()
+    key = (digest, stored_hash)
+    ok = _password_cache.get(key)
+    if ok is not None:
+        _password_cache.move_to_end(key)
+        return ok
+    ok = await run_in_threadpool(_check_password, password, stored_hash)
+    _password_cache[key] = ok
+    if len(_password_cache) > PASSWORD_CACHE_SIZE:
+        _password_cache.popitem(last=False)
+    return ok
 
 
 def to_str_id(doc: Dict[str, Any]):
@@ -37,92 +132,156 @@ def to_str_id(doc: Dict[str, Any]):
     return doc
 
 
+def body_error(error_type: str, loc: tuple, msg: str, value: Any) -> RequestValidationError:
+    return RequestValidationError([{"type": error_type, "loc": ("body", *loc), "msg": msg, "input": value}])
+
+
+async def parse_body(request: Request, cls):
+    """Build a plain dataclass payload from the JSON body, skipping pydantic.
+
+    Unknown keys are ignored and failures raise RequestValidationError, so
+    clients see the same 422 shape as for pydantic-validated bodies.
+    """
+    try:
+        body = await request.json()
+    except ValueError:
+        raise body_error("json_invalid", (), "JSON decode error", None)
+    if not isinstance(body, dict):
+        raise body_error("model_attributes_type", (), "Input should be a valid dictionary", body)
+    names = [f.name for f in fields(cls)]
+    missing = [name for name in names if name not in body]
+    if missing:
+        raise RequestValidationError([
+            {"type": "missing", "loc": ("body", name), "msg": "Field required", "input": body}
+            for name in missing
+        ])
+    try:
+        return cls(**{name: body[name] for name in names})
+    except FieldError as e:
+        raise body_error("value_error", (e.field,), str(e), body.get(e.field))
+
+
+def body_openapi(cls) -> Dict[str, Any]:
+    """openapi_extra documenting a request body that parse_body reads by hand."""
+    schema = TypeAdapter(cls).json_schema()
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": schema}}}}
+
+
+def parse_object_id(value: str) -> ObjectId:
+    # is_valid avoids raising and unwinding an exception on the happy path
+    if not ObjectId.is_valid(value):
+        raise HTTPException(status_code=400, detail="Invalid user id")
+    return ObjectId(value)
+
+
+async def valid_object_id(user_id: str) -> ObjectId:
+    """Path dependency; async so FastAPI doesn't dispatch it to the threadpool."""
+    return parse_object_id(user_id)
+
+
+# ---------------------------
+# Indexes (create_index is a no-op when the index exists)
+# ---------------------------
+INDEXES = [
+    ("user", "email", True),
+    ("progress", [("user_id", 1), ("domain", 1)], True),
+    ("assessmentresult", "user_id", False),
+    ("resume", "user_id", True),
+    ("roadmap", "domain", True),
+]
+
+
+async def ensure_indexes():
+    for collection, keys, unique in INDEXES:
+        try:
+            await db[collection].create_index(keys, unique=unique)
+        except OperationFailure as e:
+            # e.g. duplicates left by older find-then-insert code; serve without the index
+            logger.warning("Could not create index %r on %s: %s", keys, collection, e)
+
+
 # ---------------------------
 # Seed roadmaps (idempotent)
 # ---------------------------
-SEED_ROADMAPS: Dict[str, List[RoadmapStep]] = {
-    "frontend": [
-        RoadmapStep(order=1, title="HTML & CSS Basics", description="Learn HTML structure and CSS styling.", videos=[
-            "https://www.youtube.com/watch?v=G3e-cpL7ofc",
-            "https://www.youtube.com/watch?v=mU6anWqZJcc",
-        ], questions=[
-            {"q": "What tag defines a hyperlink?", "options": ["<a>", "<link>", "<href>"], "answerIndex": 0},
-            {"q": "Which property changes text color?", "options": ["font", "color", "text"], "answerIndex": 1},
-        ]),
-        RoadmapStep(order=2, title="JavaScript Fundamentals", description="Variables, functions, DOM.", videos=[
-            "https://www.youtube.com/watch?v=PkZNo7MFNFg",
-        ], questions=[
-            {"q": "Which declares a block-scoped variable?", "options": ["var", "let", "function"], "answerIndex": 1},
-            {"q": "DOM stands for?", "options": ["Document Object Model", "Data Object Method", "Display Object Map"], "answerIndex": 0},
-        ]),
-        RoadmapStep(order=3, title="React Basics", description="Components, state, props.", videos=[
-            "https://www.youtube.com/watch?v=bMknfKXIFA8",
-        ], questions=[
-            {"q": "State is used to?", "options": ["Style components", "Manage dynamic data", "Route pages"], "answerIndex": 1},
-        ]),
-    ],
-    "backend": [
-        RoadmapStep(order=1, title="Programming & Git", description="Language basics and version control.", videos=[
-            "https://www.youtube.com/watch?v=SWYqp7iY_Tc",
-        ], questions=[
-            {"q": "git commit does?", "options": ["Send to remote", "Save snapshot", "Create branch"], "answerIndex": 1},
-        ]),
-        RoadmapStep(order=2, title="Node.js & Express", description="APIs, routing, middleware.", videos=[
-            "https://www.youtube.com/watch?v=L72fhGm1tfE",
-        ], questions=[
-            {"q": "Express is?", "options": ["DB", "Framework", "Language"], "answerIndex": 1},
-        ]),
-        RoadmapStep(order=3, title="Databases", description="SQL/NoSQL basics.", videos=[
-            "https://www.youtube.com/watch?v=E-1xI85Zog8",
-        ], questions=[
-            {"q": "NoSQL example?", "options": ["MongoDB", "MySQL", "PostgreSQL"], "answerIndex": 0},
-        ]),
-    ],
-    "ai-ml": [
-        RoadmapStep(order=1, title="Python & Numpy", description="Python essentials, arrays.", videos=[
-            "https://www.youtube.com/watch?v=_uQrJ0TkZlc",
-        ], questions=[
-            {"q": "Numpy is used for?", "options": ["Web", "Arrays & math", "OS"], "answerIndex": 1},
-        ]),
-        RoadmapStep(order=2, title="Pandas & Data", description="Dataframes, cleaning.", videos=[
-            "https://www.youtube.com/watch?v=vmEHCJofslg",
-        ], questions=[
-            {"q": "Pandas DataFrame is?", "options": ["2D table", "1D list", "3D cube"], "answerIndex": 0},
-        ]),
-        RoadmapStep(order=3, title="ML Basics", description="Supervised vs unsupervised.", videos=[
-            "https://www.youtube.com/watch?v=Gv9_4yMHFhI",
-        ], questions=[
-            {"q": "Supervised uses?", "options": ["Labels", "No data", "Only images"], "answerIndex": 0},
-        ]),
-    ],
-}
+SEED_ROADMAPS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seed_roadmaps.json")
 
 
-def ensure_roadmaps_seeded():
-    if db is None:
-        return
-    for domain, steps in SEED_ROADMAPS.items():
-        existing = db.roadmap.find_one({"domain": domain})
-        if not existing:
-            db.roadmap.insert_one({
-                "domain": domain,
-                "steps": [s.model_dump() for s in steps]
-            })
+def with_answer_key(step: Dict[str, Any]) -> Dict[str, Any]:
+    if not step.get("answer_key"):
+        step["answer_key"] = [q.get("answerIndex") for q in step.get("questions", [])]
+        step["total"] = len(step["answer_key"])
+    return step
+
 
+def load_seed_roadmaps() -> Dict[str, List[Dict[str, Any]]]:
+    # Trusted data shipped with the app, so it skips RoadmapStep validation
+    with open(SEED_ROADMAPS_PATH, "rb") as f:
+        seed = orjson.loads(f.read())
+    return {domain: [with_answer_key(s) for s in steps] for domain, steps in seed.items()}
 
-ensure_roadmaps_seeded()
+
+async def ensure_roadmaps_seeded():
+    if db is None:
+        return
+    seed = load_seed_roadmaps()
+    # estimated_document_count reads collection metadata rather than scanning
+    if await db.roadmap.estimated_document_count() >= len(seed):
+        return
+    # One round trip; $setOnInsert leaves existing roadmaps untouched
+    await db.roadmap.bulk_write(
+        [UpdateOne({"domain": domain}, {"$setOnInsert": {"steps": steps}}, upsert=True) for domain, steps in seed.items()],
+        ordered=False,
+    )
+    _roadmap_cache.clear()
+
+
+# domain -> roadmap doc plus derived lookups; roadmaps are seed data, the TTL bounds
+# staleness across workers
+_roadmap_cache: TTLCache = TTLCache(maxsize=64, ttl=300)
+
+
+async def get_roadmap_cached(domain: str) -> Dict[str, Any] | None:
+    rm = _roadmap_cache.get(domain)
+    if rm is None:
+        rm = await db.roadmap.find_one({"domain": domain}, {"_id": 0})
+        if rm is not None:
+            # Roadmaps seeded before answer keys were stored get them here
+            for step in rm.get("steps", []):
+                with_answer_key(step)
+            # Cache-only, never sent to clients (get_roadmap returns just the steps)
+            rm["steps_by_order"] = {s["order"]: s for s in rm.get("steps", [])}
+            rm["answer_keys"] = {}  # step order -> int64 array, filled on first scoring
+            _roadmap_cache[domain] = rm
+    return rm
+
+
+INT64_LIMIT = 2**63  # exclusive upper bound for values stored in an int64 array
+# Stands in for out-of-range answers and missing keys; scoring only counts answers >= 0
+INVALID_INDEX = -1
+
+
+def answer_key_array(rm: Dict[str, Any], order: int) -> np.ndarray:
+    key = rm["answer_keys"].get(order)
+    if key is None:
+        key = np.asarray(
+            [k if type(k) is int and 0 <= k < INT64_LIMIT else INVALID_INDEX
+             for k in rm["steps_by_order"][order]["answer_key"]],
+            dtype=np.int64,
+        )
+        rm["answer_keys"][order] = key
+    return key
 
 
 # ---------------------------
 # Health
 # ---------------------------
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Lernify Road Backend running"}
 
 
 @app.get("/test")
-def test_database():
+async def test_database():
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -135,7 +294,7 @@ def test_database():
         if db is not None:
             response["database"] = "✅ Connected & Working"
             response["connection_status"] = "Connected"
-            response["collections"] = db.list_collection_names()
+            response["collections"] = await db.list_collection_names()
     except Exception as e:
         response["database"] = f"⚠️ Error: {str(e)[:80]}"
     return response
@@ -145,41 +304,50 @@ def test_database():
 # Auth
 # ---------------------------
 @app.post("/auth/register")
-def register(user: User):
+async def register(user: User):
     if user.qualification not in ALLOWED_QUALIFICATIONS:
         raise HTTPException(status_code=403, detail="Only IT-related students can register")
-    if db.user.find_one({"email": user.email}):
+    if await db.user.find_one({"email": user.email}):
         raise HTTPException(status_code=400, detail="Email already registered")
     doc = user.model_dump()
-    doc["password_hash"] = hash_password(doc.pop("password_hash"))
-    user_id = db.user.insert_one(doc).inserted_id
-    saved = db.user.find_one({"_id": user_id}, {"password_hash": 0})
+    doc["password_hash"] = await run_in_threadpool(hash_password, doc.pop("password_hash"))
+    try:
+        user_id = (await db.user.insert_one(doc)).inserted_id
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    saved = await db.user.find_one({"_id": user_id}, {"password_hash": 0})
     return {"user": to_str_id(saved)}
 
 
-@app.post("/auth/login")
-def login(payload: LoginRequest):
-    user = db.user.find_one({"email": payload.email})
+@app.post("/auth/login", openapi_extra=body_openapi(LoginRequest))
+async def login(request: Request):
+    payload = await parse_body(request, LoginRequest)
+    user = await db.user.find_one({"email": payload.email})
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    if user.get("password_hash") != hash_password(payload.password):
+    stored = user.get("password_hash")
+    if not stored or not await verify_password(payload.password, stored):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if is_legacy_hash(stored):
+        # Upgrade pre-bcrypt accounts now that we hold the verified plaintext
+        new_hash = await run_in_threadpool(hash_password, payload.password)
+        await db.user.update_one({"_id": user["_id"], "password_hash": stored}, {"$set": {"password_hash": new_hash}})
     user.pop("password_hash", None)
     return {"user": to_str_id(user)}
 
 
-@app.post("/auth/change-password")
-def change_password(payload: ChangePasswordRequest):
-    try:
-        _id = ObjectId(payload.user_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid user id")
-    user = db.user.find_one({"_id": _id})
+@app.post("/auth/change-password", openapi_extra=body_openapi(ChangePasswordRequest))
+async def change_password(request: Request):
+    payload = await parse_body(request, ChangePasswordRequest)
+    _id = parse_object_id(payload.user_id)
+    user = await db.user.find_one({"_id": _id})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    if user.get("password_hash") != hash_password(payload.old_password):
+    stored = user.get("password_hash")
+    if not stored or not await verify_password(payload.old_password, stored):
         raise HTTPException(status_code=401, detail="Old password incorrect")
-    db.user.update_one({"_id": _id}, {"$set": {"password_hash": hash_password(payload.new_password)}})
+    new_hash = await run_in_threadpool(hash_password, payload.new_password)
+    await db.user.update_one({"_id": _id}, {"$set": {"password_hash": new_hash}})
     return {"message": "Password updated"}
 
 
@@ -187,12 +355,8 @@ def change_password(payload: ChangePasswordRequest):
 # Profile
 # ---------------------------
 @app.get("/profile/{user_id}")
-def get_profile(user_id: str):
-    try:
-        _id = ObjectId(user_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid user id")
-    user = db.user.find_one({"_id": _id}, {"password_hash": 0})
+async def get_profile(_id: ObjectId = Depends(valid_object_id)):
+    user = await db.user.find_one({"_id": _id}, {"password_hash": 0})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return {"user": to_str_id(user)}
@@ -207,76 +371,93 @@ class UpdateProfile(BaseModel):
 
 
 @app.put("/profile/{user_id}")
-def update_profile(user_id: str, payload: UpdateProfile):
-    try:
-        _id = ObjectId(user_id)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid user id")
+async def update_profile(payload: UpdateProfile, _id: ObjectId = Depends(valid_object_id)):
     updates = payload.model_dump()
     if updates.get("qualification") not in ALLOWED_QUALIFICATIONS:
         raise HTTPException(status_code=400, detail="Invalid qualification")
-    db.user.update_one({"_id": _id}, {"$set": updates})
-    user = db.user.find_one({"_id": _id}, {"password_hash": 0})
+    await db.user.update_one({"_id": _id}, {"$set": updates})
+    user = await db.user.find_one({"_id": _id}, {"password_hash": 0})
     return {"user": to_str_id(user)}
 
 
 # ---------------------------
 # Roadmaps
 # ---------------------------
-@app.get("/roadmaps")
-def list_domains():
-    domains = [d["domain"] for d in db.roadmap.find({}, {"domain": 1, "_id": 0})]
-    return {"domains": domains}
+@app.get("/roadmaps", response_model=None)
+async def list_domains():
+    domains = [d["domain"] async for d in db.roadmap.find({}, {"domain": 1, "_id": 0})]
+    return ORJSONResponse(content={"domains": domains})
 
 
-@app.get("/roadmaps/{domain}")
-def get_roadmap(domain: str):
-    rm = db.roadmap.find_one({"domain": domain})
+@app.get("/roadmaps/{domain}", response_model=None)
+async def get_roadmap(domain: str):
+    rm = await get_roadmap_cached(domain)
     if not rm:
         raise HTTPException(status_code=404, detail="Roadmap not found")
-    return {"domain": domain, "steps": rm.get("steps", [])}
+    return ORJSONResponse(content={"domain": domain, "steps": rm.get("steps", [])})
 
 
 # ---------------------------
 # Assessments and Progress
 # ---------------------------
-class SubmitAssessment(BaseModel):
+@dataclass(slots=True)
+class SubmitAssessment:
     user_id: str
     domain: str
     step_order: int
     answers: List[int]
 
+    def __post_init__(self):
+        check_str("user_id", self.user_id)
+        check_str("domain", self.domain)
+        self.step_order = as_int("step_order", self.step_order)
+        if not isinstance(self.answers, list):
+            raise FieldError("answers", "answers must be a list of integers")
+        # Answers outside int64 can never be right; bound them here so scoring can hand
+        # the list straight to numpy without it wrapping or overflowing
+        self.answers = [
+            a if 0 <= a < INT64_LIMIT else INVALID_INDEX
+            for a in (as_int("answers", v) for v in self.answers)
+        ]
+
 
 @app.get("/progress/{user_id}/{domain}")
-def get_progress(user_id: str, domain: str):
-    prog = db.progress.find_one({"user_id": user_id, "domain": domain})
-    if not prog:
-        prog = Progress(user_id=user_id, domain=domain, completed_steps=[], scores={}).model_dump()
-        db.progress.insert_one(prog)
+async def get_progress(user_id: str, domain: str):
+    default = Progress(user_id=user_id, domain=domain).model_dump(exclude={"user_id", "domain"})
+    prog = await db.progress.find_one_and_update(
+        {"user_id": user_id, "domain": domain},
+        {"$setOnInsert": default},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
     return {"progress": to_str_id(prog)}
 
 
-@app.post("/assessments/submit")
-def submit_assessment(payload: SubmitAssessment):
-    rm = db.roadmap.find_one({"domain": payload.domain})
+@app.post("/assessments/submit", openapi_extra=body_openapi(SubmitAssessment))
+async def submit_assessment(request: Request):
+    payload = await parse_body(request, SubmitAssessment)
+    rm = await get_roadmap_cached(payload.domain)
     if not rm:
         raise HTTPException(status_code=404, detail="Roadmap not found")
-    steps = rm.get("steps", [])
-    step = next((s for s in steps if s.get("order") == payload.step_order), None)
+    step = rm["steps_by_order"].get(payload.step_order)
     if not step:
         raise HTTPException(status_code=404, detail="Step not found")
 
-    # Gatekeeping: ensure previous step completed
-    prog = db.progress.find_one({"user_id": payload.user_id, "domain": payload.domain})
-    if not prog:
-        prog = Progress(user_id=payload.user_id, domain=payload.domain, completed_steps=[], scores={}).model_dump()
-        db.progress.insert_one(prog)
-    if payload.step_order > 1 and (payload.step_order - 1) not in prog.get("completed_steps", []):
-        raise HTTPException(status_code=403, detail="Complete previous step first")
-
-    correct_indexes = [q.get("answerIndex") for q in step.get("questions", [])]
-    score = sum(1 for i, ans in enumerate(payload.answers) if i < len(correct_indexes) and ans == correct_indexes[i])
-    total = len(correct_indexes)
+    # Gatekeeping: ensure previous step completed (the first step has none)
+    if payload.step_order > 1:
+        prev_done = await db.progress.find_one(
+            {"user_id": payload.user_id, "domain": payload.domain, "completed_steps": payload.step_order - 1},
+            {"_id": 1},
+        )
+        if not prev_done:
+            raise HTTPException(status_code=403, detail="Complete previous step first")
+
+    key = answer_key_array(rm, payload.step_order)
+    n = min(len(payload.answers), len(key))
+    # SubmitAssessment already bounded every answer to int64, so no per-answer Python work here
+    answers = np.asarray(payload.answers[:n], dtype=np.int64)
+    score = int(np.count_nonzero((answers == key[:n]) & (answers >= 0)))
+    total = step["total"]
     passed = score >= max(1, int(0.6 * total))  # 60% pass
 
     result = AssessmentResult(
@@ -287,54 +468,83 @@ def submit_assessment(payload: SubmitAssessment):
         total=total,
         passed=passed,
     ).model_dump()
-    db.assessmentresult.insert_one(result)
-
+    # The two writes hit different collections, so issue them concurrently
+    writes = [db.assessmentresult.insert_one(result)]
     if passed:
-        db.progress.update_one(
+        writes.append(db.progress.update_one(
             {"user_id": payload.user_id, "domain": payload.domain},
             {
                 "$addToSet": {"completed_steps": payload.step_order},
                 "$set": {f"scores.{payload.step_order}": score}
             },
             upsert=True,
-        )
+        ))
+    await asyncio.gather(*writes)
+    # insert_one adds the ObjectId to result; expose it as "id" and reuse the dict
+    to_str_id(result)
 
     return {"result": result, "message": "Passed" if passed else "Failed"}
 
 
-@app.get("/dashboard/{user_id}")
-def dashboard(user_id: str):
-    results = list(db.assessmentresult.find({"user_id": user_id}))
-    for r in results:
-        to_str_id(r)
-    progresses = list(db.progress.find({"user_id": user_id}))
-    for p in progresses:
-        to_str_id(p)
-    return {
-        "assessments": results,
-        "progress": progresses,
+# The server renames and stringifies _id, so dashboard docs need no per-doc fixup here
+DASHBOARD_RESULT_FIELDS = {
+    "id": {"$toString": "$_id"},
+    "domain": "$domain",
+    "step_order": "$step_order",
+    "score": "$score",
+    "total": "$total",
+    "passed": "$passed",
+}
+DASHBOARD_PROGRESS_FIELDS = {
+    "id": {"$toString": "$_id"},
+    "domain": "$domain",
+    "completed_steps": "$completed_steps",
+    "scores": "$scores",
+}
+
+
+def dashboard_pipeline(user_id: str) -> List[Dict[str, Any]]:
+    """One aggregation over both collections, grouped into {_id: section, docs: [...]}."""
+    return [
+        {"$match": {"user_id": user_id}},
+        {"$project": {"_id": 0, "section": "assessments", "doc": DASHBOARD_RESULT_FIELDS}},
+        {"$unionWith": {"coll": "progress", "pipeline": [
+            {"$match": {"user_id": user_id}},
+            {"$project": {"_id": 0, "section": "progress", "doc": DASHBOARD_PROGRESS_FIELDS}},
+        ]}},
+        {"$group": {"_id": "$section", "docs": {"$push": "$doc"}}},
+    ]
+
+
+@app.get("/dashboard/{user_id}", response_model=None)
+async def dashboard(user_id: str):
+    sections = {
+        group["_id"]: group["docs"]
+        async for group in db.assessmentresult.aggregate(dashboard_pipeline(user_id))
     }
+    return ORJSONResponse(content={
+        "assessments": sections.get("assessments", []),
+        "progress": sections.get("progress", []),
+    })
 
 
 # ---------------------------
 # Resume
 # ---------------------------
 @app.post("/resume")
-def upsert_resume(payload: Resume):
-    existing = db.resume.find_one({"user_id": payload.user_id})
-    data = payload.model_dump()
-    if existing:
-        db.resume.update_one({"_id": existing["_id"]}, {"$set": data})
-        stored = db.resume.find_one({"_id": existing["_id"]})
-    else:
-        new_id = db.resume.insert_one(data).inserted_id
-        stored = db.resume.find_one({"_id": new_id})
+async def upsert_resume(payload: Resume):
+    stored = await db.resume.find_one_and_update(
+        {"user_id": payload.user_id},
+        {"$set": payload.model_dump()},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
     return {"resume": to_str_id(stored)}
 
 
 @app.get("/resume/{user_id}")
-def get_resume(user_id: str):
-    res = db.resume.find_one({"user_id": user_id})
+async def get_resume(user_id: str):
+    res = await db.resume.find_one({"user_id": user_id})
     if not res:
         raise HTTPException(status_code=404, detail="Resume not found")
     return {"resume": to_str_id(res)}
@@ -343,4 +553,5 @@ def get_resume(user_id: str):
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1))
+    uvicorn.run("main:app", host="0.0.0.0", port=port, loop="uvloop", http="httptools", workers=workers)
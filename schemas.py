@@ -4,6 +4,8 @@ Database Schemas for Lernify Road
 Each Pydantic model represents a collection in MongoDB (collection name is the lowercase class name).
 """
 
+import re
+from dataclasses import dataclass
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field, EmailStr, constr
 
@@ -31,14 +33,62 @@ class User(BaseModel):
     role: str = Field("student")
     avatar_url: Optional[str] = None
 
-class LoginRequest(BaseModel):
-    email: EmailStr
-    password: constr(min_length=6)
+# Hot auth payloads are plain slots dataclasses checked by hand; __post_init__ raises
+# FieldError so the caller can report it like a pydantic validation error.
+
+class FieldError(ValueError):
+    def __init__(self, field: str, msg: str):
+        super().__init__(msg)
+        self.field = field
+
+def check_str(name: str, value: Any, min_length: int = 0) -> None:
+    if not isinstance(value, str) or len(value) < min_length:
+        raise FieldError(name, f"{name} must be a string of at least {min_length} characters")
+
+# ASCII digits, optional sign and single underscores, optionally followed by ".0..."
+_INT_STRING = re.compile(r"\s*([+-]?\d+(?:_\d+)*)(?:\.0+)?\s*", re.ASCII)
+
+def as_int(name: str, value: Any) -> int:
+    """Lax int coercion with the same accept/reject rules as pydantic's TypeAdapter(int).
 
-class ChangePasswordRequest(BaseModel):
+    Accepts ints and bools, integral floats below 2**63 in magnitude, and
+    strings like "12", " -1_000 " or "2.0"; rejects fractions, exponents,
+    non-ASCII digits and everything else.
+    """
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float) and value.is_integer() and abs(value) < 2**63:
+        return int(value)
+    if isinstance(value, str):
+        match = _INT_STRING.fullmatch(value)
+        if match:
+            return int(match.group(1))
+    raise FieldError(name, f"{name} must be an integer")
+
+@dataclass(slots=True)
+class LoginRequest:
+    email: str
+    password: str
+
+    def __post_init__(self):
+        check_str("email", self.email)
+        local, _, domain = self.email.strip().rpartition("@")
+        if not local or "." not in domain:
+            raise FieldError("email", "email is not a valid address")
+        # Match how EmailStr normalized the address at registration
+        self.email = f"{local}@{domain.lower()}"
+        check_str("password", self.password, 6)
+
+@dataclass(slots=True)
+class ChangePasswordRequest:
     user_id: str
-    old_password: constr(min_length=6)
-    new_password: constr(min_length=6)
+    old_password: str
+    new_password: str
+
+    def __post_init__(self):
+        check_str("user_id", self.user_id)
+        check_str("old_password", self.old_password, 6)
+        check_str("new_password", self.new_password, 6)
 
 # ---------------------------
 # ROADMAP AND ASSESSMENT
@@ -50,6 +100,8 @@ class RoadmapStep(BaseModel):
     description: str
     videos: List[str] = []  # YouTube URLs
     questions: List[Dict[str, Any]] = []  # [{question, options:[], answerIndex}]
+    answer_key: List[int] = []  # answerIndex per question, filled in at seed time
+    total: int = 0  # len(answer_key)
 
 class AssessmentResult(BaseModel):
     user_id: str